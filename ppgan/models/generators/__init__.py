@@ -1,2 +1,3 @@
 from .resnet import ResnetGenerator
-from .unet import UnetGenerator
\ No newline at end of file
+from .unet import UnetGenerator
+from .makeup import GeneratorPSGANAttention
\ No newline at end of file
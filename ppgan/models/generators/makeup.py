@@ -0,0 +1,700 @@
+import numpy as np
+
+import paddle
+import paddle.nn as nn
+from paddle import fluid
+
+from .builder import GENERATORS
+
+ATTENTION_SCALE = 200.0
+MASK_PENALTY = 100.0
+
+
+def masked_attention(query,
+                     key,
+                     value,
+                     mask_bias=None,
+                     scale=ATTENTION_SCALE,
+                     transpose_key=False,
+                     use_fp16=False):
+    """Scaled masked softmax attention.
+
+    Single call site for the matmul -> scale -> mask -> softmax -> apply
+    chain of MANet, with the mask folded in as a precomputed additive bias
+    and the scale folded into the GEMM via matmul's alpha. The query is
+    expected pre-transposed to [N, HW_x, C] so the logits GEMM always
+    takes the non-transposed left-operand path. Callers with several
+    per-position values to gather (e.g. beta and gamma) stack them along
+    the last axis of value so one GEMM applies the weights to all of them.
+    Keeping the whole block behind one function lets it be swapped for a
+    flash-attention style fused kernel (which would stream the softmax and
+    never materialize the [HW_x, HW_y] matrix) without touching callers;
+    with builtin ops it runs the minimal eager sequence.
+
+    With ``use_fp16=True`` the two GEMMs run in float16 (Tensor Core path,
+    half the HBM bytes for the [HW_x, HW_y] matrix) while the mask bias
+    and softmax stay in float32; the result is returned as float32.
+    """
+    if use_fp16:
+        query = fluid.layers.cast(query, 'float16')
+        key = fluid.layers.cast(key, 'float16')
+    logits = fluid.layers.matmul(query,
+                                 key,
+                                 transpose_y=transpose_key,
+                                 alpha=scale)
+    if use_fp16:
+        logits = fluid.layers.cast(logits, 'float32')
+    if mask_bias is not None:
+        logits = logits + mask_bias
+    weights = fluid.layers.softmax(logits)
+    if use_fp16:
+        out = fluid.layers.matmul(fluid.layers.cast(weights, 'float16'),
+                                  fluid.layers.cast(value, 'float16'))
+        return fluid.layers.cast(out, 'float32')
+    return fluid.layers.matmul(weights, value)
+
+
+def quantize_encoders(generator):
+    """Wrap the PSGAN encoder subnets for INT8 post-training quantization.
+
+    Only the conv-heavy MDNet and TNetDown encoders are quantized -- they
+    dominate runtime and sit upstream of the normalizations, which makes
+    them tolerant to INT8. The attention matmul, softmax, modulation math
+    and the img_reg/tanh output stay in float for quality. After calling
+    this, run a few hundred reference forwards for calibration, then save
+    with ``ptq.save_quantized_model``.
+
+    Requires paddleslim.
+    """
+    try:
+        from paddleslim.dygraph.quant import PTQ
+    except ImportError:
+        raise ImportError(
+            'paddleslim is required for INT8 quantization of the PSGAN '
+            'encoders: pip install paddleslim')
+    ptq = PTQ()
+    generator.md_net = ptq.quantize(generator.md_net)
+    generator.ma_net.encoder = ptq.quantize(generator.ma_net.encoder)
+    return generator
+
+
+def affine_modulate(x, gamma, beta):
+    """x * (1 + gamma) + beta behind one call site.
+
+    This add/multiply/add triple appears at every style-modulation point;
+    expressing it once gives graph passes a single broadcasted FMA pattern
+    to fuse into one elementwise kernel (a custom op could do the same for
+    eager mode, but would have to live in the Paddle core tree).
+    """
+    return x * (1.0 + gamma) + beta
+
+
+class NearestUpsample(paddle.fluid.dygraph.Layer):
+    """Nearest-neighbor spatial upsampling for NCHW or NHWC inputs."""
+
+    def __init__(self, scale=2, data_format='NCHW'):
+        super(NearestUpsample, self).__init__()
+        self.scale = scale
+        self.data_format = data_format
+
+    def forward(self, x):
+        """forward"""
+        return fluid.layers.resize_nearest(x,
+                                           scale=self.scale,
+                                           data_format=self.data_format)
+
+
+class PONO(paddle.fluid.dygraph.Layer):
+    """Positional normalization, normalizes each position over the channel axis."""
+
+    def __init__(self, eps=1e-5, data_format='NCHW'):
+        super(PONO, self).__init__()
+        self.eps = eps
+        self.channel_axis = 1 if data_format == 'NCHW' else -1
+
+    def forward(self, x):
+        """forward"""
+        # single pass over x: var = E[x^2] - E[x]^2, so the centered
+        # intermediate (x - mean) is never materialized for the reduction,
+        # and rsqrt + multiply replaces sqrt + divide
+        mean = fluid.layers.reduce_mean(x,
+                                        dim=self.channel_axis,
+                                        keep_dim=True)
+        mean_sq = fluid.layers.reduce_mean(fluid.layers.square(x),
+                                           dim=self.channel_axis,
+                                           keep_dim=True)
+        # E[x^2] - E[x]^2 can dip just below zero in floating point for
+        # near-constant positions; clamp before the rsqrt
+        var = fluid.layers.relu(mean_sq - fluid.layers.square(mean))
+        output = (x - mean) * fluid.layers.rsqrt(var + self.eps)
+        return output
+
+
+class InstanceNormNHWC(paddle.fluid.dygraph.Layer):
+    """Instance normalization over the spatial dims of an NHWC tensor.
+
+    nn.InstanceNorm only accepts NCHW input (it reduces over the trailing
+    spatial dims and scales along dim 1), so the channels-last path gets a
+    composed equivalent: per-(sample, channel) statistics reduced over H
+    and W, with an optional affine along the trailing channel axis.
+    """
+
+    def __init__(self, num_channels, eps=1e-5, affine=True):
+        super(InstanceNormNHWC, self).__init__()
+        self.eps = eps
+        if affine:
+            self.scale = self.create_parameter(
+                shape=[num_channels],
+                dtype='float32',
+                default_initializer=fluid.initializer.Constant(1.0))
+            self.bias = self.create_parameter(
+                shape=[num_channels],
+                dtype='float32',
+                is_bias=True,
+                default_initializer=fluid.initializer.Constant(0.0))
+        else:
+            self.scale = None
+            self.bias = None
+
+    def forward(self, x):
+        """forward"""
+        mean = fluid.layers.reduce_mean(x, dim=[1, 2], keep_dim=True)
+        mean_sq = fluid.layers.reduce_mean(fluid.layers.square(x),
+                                           dim=[1, 2],
+                                           keep_dim=True)
+        # E[x^2] - E[x]^2 can dip just below zero in floating point;
+        # clamp before the rsqrt
+        var = fluid.layers.relu(mean_sq - fluid.layers.square(mean))
+        out = (x - mean) * fluid.layers.rsqrt(var + self.eps)
+        if self.scale is not None:
+            out = out * self.scale + self.bias
+        return out
+
+
+def build_instance_norm(num_channels, affine=True, data_format='NCHW'):
+    """Instance norm for either layout; nn.InstanceNorm is NCHW-only."""
+    if data_format == 'NCHW':
+        attr = None if affine else False
+        return nn.InstanceNorm(num_channels, param_attr=attr, bias_attr=attr)
+    return InstanceNormNHWC(num_channels, affine=affine)
+
+
+class FusedConvINReLU(paddle.fluid.dygraph.Layer):
+    """Conv2D + InstanceNorm (+ ReLU) expressed as one block.
+
+    Keeping the triplet behind a single call site gives graph-level fusion
+    passes a stable conv -> instance_norm -> relu pattern to collapse into
+    one kernel; in eager mode it runs the three plain ops. An optional
+    residual input is added in the epilogue, directly after the norm, so
+    the skip connection stays adjacent to the conv for elementwise-add
+    fusion instead of being a detached add in the caller.
+    """
+
+    def __init__(self,
+                 dim_in,
+                 dim_out,
+                 filter_size=3,
+                 stride=1,
+                 padding=1,
+                 affine=True,
+                 with_relu=True,
+                 data_format='NCHW'):
+        super(FusedConvINReLU, self).__init__()
+        self.conv = nn.Conv2D(dim_in,
+                              dim_out,
+                              filter_size=filter_size,
+                              stride=stride,
+                              padding=padding,
+                              bias_attr=False,
+                              data_format=data_format)
+        self.norm = build_instance_norm(dim_out,
+                                        affine=affine,
+                                        data_format=data_format)
+        self.with_relu = with_relu
+
+    def forward(self, x, residual=None):
+        """forward"""
+        out = self.norm(self.conv(x))
+        if residual is not None:
+            out = out + residual
+        if self.with_relu:
+            out = fluid.layers.relu(out)
+        return out
+
+
+class ResidualBlock(paddle.fluid.dygraph.Layer):
+    """Residual Block with instance normalization."""
+
+    def __init__(self, dim_in, dim_out, mode=None, data_format='NCHW'):
+        super(ResidualBlock, self).__init__()
+        affine = mode != 't'
+        self.block1 = FusedConvINReLU(dim_in,
+                                      dim_out,
+                                      affine=affine,
+                                      data_format=data_format)
+        self.block2 = FusedConvINReLU(dim_out,
+                                      dim_out,
+                                      affine=affine,
+                                      with_relu=False,
+                                      data_format=data_format)
+
+    def forward(self, x):
+        """forward"""
+        return self.block2(self.block1(x), residual=x)
+
+
+class StyleResidualBlock(paddle.fluid.dygraph.Layer):
+    """Residual Block with PONO and style modulation."""
+
+    def __init__(self, dim_in, dim_out, data_format='NCHW'):
+        super(StyleResidualBlock, self).__init__()
+        self.block1 = nn.Sequential(
+            nn.Conv2D(dim_in,
+                      dim_out,
+                      filter_size=3,
+                      stride=1,
+                      padding=1,
+                      bias_attr=False,
+                      data_format=data_format), PONO(data_format=data_format))
+        ks = 3
+        pw = ks // 2
+        self.channel_axis = 1 if data_format == 'NCHW' else -1
+
+        # beta and gamma come from one conv over the shared input y and are
+        # split channel-wise: one GEMM and one im2col instead of two. The
+        # gamma half of the bias starts at 1, so the conv already outputs
+        # (1 + gamma) and forward applies g * x + b with no extra add; the
+        # reparameterization is exact since the bias is learned either way
+        def bg_bias_attr():
+            bias = np.concatenate([np.zeros(dim_out),
+                                   np.ones(dim_out)]).astype('float32')
+            return fluid.ParamAttr(
+                initializer=fluid.initializer.NumpyArrayInitializer(bias))
+
+        self.bg1 = nn.Conv2D(dim_in,
+                             2 * dim_out,
+                             filter_size=ks,
+                             padding=pw,
+                             bias_attr=bg_bias_attr(),
+                             data_format=data_format)
+        self.block2 = nn.Sequential(
+            nn.ReLU(),
+            nn.Conv2D(dim_out,
+                      dim_out,
+                      filter_size=3,
+                      stride=1,
+                      padding=1,
+                      bias_attr=False,
+                      data_format=data_format), PONO(data_format=data_format))
+        self.bg2 = nn.Conv2D(dim_in,
+                             2 * dim_out,
+                             filter_size=ks,
+                             padding=pw,
+                             bias_attr=bg_bias_attr(),
+                             data_format=data_format)
+
+    def precompute_style(self, y):
+        """Run the style convs on y once; reusable across forwards with the same y."""
+        b1, g1 = fluid.layers.split(self.bg1(y), 2, dim=self.channel_axis)
+        b2, g2 = fluid.layers.split(self.bg2(y), 2, dim=self.channel_axis)
+        return (b1, g1, b2, g2)
+
+    def forward(self, x, y, style_cache=None):
+        """forward"""
+        if style_cache is None:
+            style_cache = self.precompute_style(y)
+        b1, g1, b2, g2 = style_cache
+        x_ = self.block1(x)
+        x_ = g1 * x_ + b1
+        x_ = self.block2(x_)
+        x_ = g2 * x_ + b2
+        return x + x_
+
+
+class MDNet(paddle.fluid.dygraph.Layer):
+    """MDNet in PSGAN"""
+
+    def __init__(self, conv_dim=64, repeat_num=3, data_format='NCHW'):
+        super(MDNet, self).__init__()
+
+        layers = []
+        layers.append(
+            FusedConvINReLU(3,
+                            conv_dim,
+                            filter_size=7,
+                            stride=1,
+                            padding=3,
+                            affine=False,
+                            data_format=data_format))
+
+        # Down-Sampling
+        curr_dim = conv_dim
+        for i in range(2):
+            layers.append(
+                FusedConvINReLU(curr_dim,
+                                curr_dim * 2,
+                                filter_size=4,
+                                stride=2,
+                                padding=1,
+                                affine=False,
+                                data_format=data_format))
+            curr_dim = curr_dim * 2
+
+        # Bottleneck
+        for i in range(repeat_num):
+            layers.append(
+                ResidualBlock(dim_in=curr_dim,
+                              dim_out=curr_dim,
+                              mode='t',
+                              data_format=data_format))
+
+        self.main = nn.Sequential(*layers)
+
+    def forward(self, x):
+        """forward"""
+        out = self.main(x)
+        return out
+
+
+class TNetDown(paddle.fluid.dygraph.Layer):
+    """TNetDown in PSGAN"""
+
+    def __init__(self, conv_dim=64, repeat_num=3, data_format='NCHW'):
+        super(TNetDown, self).__init__()
+
+        layers = []
+        layers.append(
+            FusedConvINReLU(3,
+                            conv_dim,
+                            filter_size=7,
+                            stride=1,
+                            padding=3,
+                            affine=False,
+                            data_format=data_format))
+
+        # Down-Sampling
+        curr_dim = conv_dim
+        for i in range(2):
+            layers.append(
+                FusedConvINReLU(curr_dim,
+                                curr_dim * 2,
+                                filter_size=4,
+                                stride=2,
+                                padding=1,
+                                affine=False,
+                                data_format=data_format))
+            curr_dim = curr_dim * 2
+
+        # Bottleneck
+        for i in range(repeat_num):
+            layers.append(
+                ResidualBlock(dim_in=curr_dim,
+                              dim_out=curr_dim,
+                              mode='t',
+                              data_format=data_format))
+
+        self.main = nn.Sequential(*layers)
+
+    def forward(self, x):
+        """forward"""
+        out = self.main(x)
+        return out
+
+
+class GetMatrix(paddle.fluid.dygraph.Layer):
+    """Predicts the makeup gamma/beta matrices with one shared 1x1 conv."""
+
+    def __init__(self, dim_in, dim_out, data_format='NCHW'):
+        super(GetMatrix, self).__init__()
+        self.channel_axis = 1 if data_format == 'NCHW' else -1
+        self.get_gb = nn.Conv2D(dim_in,
+                                2 * dim_out,
+                                filter_size=1,
+                                stride=1,
+                                padding=0,
+                                bias_attr=False,
+                                data_format=data_format)
+
+    def forward(self, x):
+        """forward"""
+        gamma, beta = fluid.layers.split(self.get_gb(x),
+                                         2,
+                                         dim=self.channel_axis)
+        return gamma, beta
+
+
+class MANet(paddle.fluid.dygraph.Layer):
+    """MANet in PSGAN"""
+
+    def __init__(self,
+                 conv_dim=64,
+                 repeat_num=3,
+                 w=0.01,
+                 data_format='NCHW',
+                 fp16_attention=False):
+        super(MANet, self).__init__()
+        self.fp16_attention = fp16_attention
+        self.encoder = TNetDown(conv_dim=conv_dim,
+                                repeat_num=repeat_num,
+                                data_format=data_format)
+        curr_dim = conv_dim * 4
+        self.w = w
+        # x_flat and y_flat both carried a `w *` elementwise multiply before
+        # the attention matmul; since the matmul is bilinear the two scalars
+        # fold into its scale (w * w * ATTENTION_SCALE), and the positional
+        # features concatenated alongside are pre-scaled by 1/w so their
+        # contribution to the logits is unchanged
+        self.atten_scale = ATTENTION_SCALE * w * w
+        self.inv_w = 1.0 / w
+        self.data_format = data_format
+        self._mask_bias = None
+        self._cached_mask = None
+        self._mask_memo = None
+        # combined beta | gamma conv, split channel-wise where consumed
+        self.bg = nn.Conv2D(curr_dim,
+                            2 * curr_dim,
+                            filter_size=3,
+                            padding=1,
+                            data_format=data_format)
+        # get the makeup matrix
+        self.simple_spade = GetMatrix(curr_dim, 1, data_format=data_format)
+        self.repeat_num = repeat_num
+        self.bottlenecks = fluid.dygraph.LayerList([
+            ResidualBlock(dim_in=curr_dim,
+                          dim_out=curr_dim,
+                          mode='t',
+                          data_format=data_format) for _ in range(repeat_num)
+        ])
+
+        # Up-Sampling
+        y_dim = curr_dim
+        up_samplers = []
+        up_acts = []
+        up_bgs = []
+        for i in range(2):
+            # nearest upsample + 3x3 conv instead of a 4x4 stride-2
+            # transpose conv: smaller GEMM, regular memory access and no
+            # checkerboard artifacts
+            up_samplers.append(
+                nn.Sequential(
+                    NearestUpsample(scale=2, data_format=data_format),
+                    nn.Conv2D(curr_dim,
+                              curr_dim // 2,
+                              filter_size=3,
+                              padding=1,
+                              bias_attr=False,
+                              data_format=data_format),
+                    build_instance_norm(curr_dim // 2,
+                                        affine=False,
+                                        data_format=data_format)))
+            up_acts.append(nn.ReLU())
+            # one conv produces the concatenated beta | gamma maps for this
+            # level; consumers split channel-wise
+            up_bgs.append(
+                nn.Sequential(
+                    NearestUpsample(scale=2, data_format=data_format),
+                    nn.Conv2D(y_dim,
+                              2 * (curr_dim // 2),
+                              filter_size=3,
+                              padding=1,
+                              data_format=data_format)))
+            curr_dim = curr_dim // 2
+        self.up_samplers = fluid.dygraph.LayerList(up_samplers)
+        self.up_acts = fluid.dygraph.LayerList(up_acts)
+        self.up_bgs = fluid.dygraph.LayerList(up_bgs)
+
+        self.img_reg = nn.Sequential(
+            nn.Conv2D(curr_dim,
+                      3,
+                      filter_size=7,
+                      stride=1,
+                      padding=3,
+                      bias_attr=False,
+                      data_format=data_format))
+
+    def set_consistency_mask(self, mask):
+        """Precompute the additive attention bias, used when forward gets no mask."""
+        self._mask_bias = None if mask is None else -MASK_PENALTY * (1.0 -
+                                                                     mask)
+
+    def precompute_style(self, y, y_p=None):
+        """Run the reference-only branch once and return its products.
+
+        Everything here depends only on the reference feature y (and its
+        positional features y_p), so callers that reuse one reference for
+        many source images can compute it a single time.
+        """
+        if self.data_format == 'NCHW':
+            _, c2, h2, w2 = y.shape
+            y_flat = fluid.layers.reshape(y, [-1, c2, h2 * w2])
+        else:
+            _, h2, w2, c2 = y.shape
+            y_flat = fluid.layers.reshape(y, [-1, h2 * w2, c2])
+        if y_p is not None:
+            y_p = self.inv_w * y_p
+            if self.data_format == 'NCHW':
+                y_flat = fluid.layers.concat([y_flat, y_p], axis=1)
+            else:
+                y_flat = fluid.layers.concat(
+                    [y_flat, fluid.layers.transpose(y_p, [0, 2, 1])], axis=-1)
+
+        gamma, beta = self.simple_spade(y)
+        # stacked [beta | gamma] values, gathered by one attention GEMM
+        bg_flat = fluid.layers.concat([
+            fluid.layers.reshape(beta, [-1, h2 * w2, 1]),
+            fluid.layers.reshape(gamma, [-1, h2 * w2, 1])
+        ],
+                                      axis=-1)
+        return {'y_flat': y_flat, 'bg_flat': bg_flat}
+
+    def forward(self,
+                x,
+                y,
+                x_p,
+                y_p,
+                consistency_mask,
+                mask_x,
+                mask_y,
+                style_cache=None):
+        """forward"""
+        # y -> ref feature
+        # x -> src img
+        x = self.encoder(x)
+        if self.data_format == 'NCHW':
+            _, c, h, w = x.shape
+            # materialize the [N, HW, C] query once, instead of paying the
+            # transposed-GEMM path inside the attention matmul every call
+            x_flat = fluid.layers.transpose(
+                fluid.layers.reshape(x, [-1, c, h * w]), [0, 2, 1])
+        else:
+            _, h, w, c = x.shape
+            x_flat = fluid.layers.reshape(x, [-1, h * w, c])
+        if x_p is not None:
+            x_flat = fluid.layers.concat([
+                x_flat,
+                fluid.layers.transpose(self.inv_w * x_p, [0, 2, 1])
+            ],
+                                         axis=-1)
+
+        if style_cache is None:
+            style_cache = self.precompute_style(y, y_p)
+        y_flat = style_cache['y_flat']
+
+        # the bias is a pure function of the mask, which is commonly shared
+        # across the frames of a video; recompute it only when the mask
+        # tensor actually changes. The memo holds the mask itself and
+        # compares by identity -- id() of a collected tensor can be reused
+        # -- and, being a Python-side effect, is skipped while tracing for
+        # to_static
+        if consistency_mask is None:
+            mask_bias = self._mask_bias
+        elif fluid.in_dygraph_mode() and \
+                consistency_mask is self._cached_mask:
+            mask_bias = self._mask_memo
+        else:
+            mask_bias = -MASK_PENALTY * (1.0 - consistency_mask)
+            if fluid.in_dygraph_mode():
+                self._cached_mask = consistency_mask
+                self._mask_memo = mask_bias
+
+        bg = masked_attention(x_flat,
+                              y_flat,
+                              style_cache['bg_flat'],
+                              mask_bias=mask_bias,
+                              scale=self.atten_scale,
+                              transpose_key=self.data_format != 'NCHW',
+                              use_fp16=self.fp16_attention)
+        beta, gamma = fluid.layers.split(bg, 2, dim=-1)
+        if self.data_format == 'NCHW':
+            beta = fluid.layers.reshape(beta, [-1, 1, h, w])
+            gamma = fluid.layers.reshape(gamma, [-1, 1, h, w])
+        else:
+            beta = fluid.layers.reshape(beta, [-1, h, w, 1])
+            gamma = fluid.layers.reshape(gamma, [-1, h, w, 1])
+        x = affine_modulate(x, gamma, beta)
+
+        # iterate the LayerLists directly: their lengths are fixed at
+        # construction, so tracing unrolls the towers into straight-line
+        # ops that the IR passes can fuse and schedule across, with no
+        # loop or index ops in the compiled program
+        for bottleneck in self.bottlenecks:
+            x = bottleneck(x)
+
+        for up_sampler, up_act in zip(self.up_samplers, self.up_acts):
+            x = up_act(up_sampler(x))
+
+        x = self.img_reg(x)
+        x = fluid.layers.tanh(x)
+        return x
+
+
+@GENERATORS.register()
+class GeneratorPSGANAttention(paddle.fluid.dygraph.Layer):
+    """Generator of PSGAN, kept as MDNet (reference branch) + MANet.
+
+    Inputs and outputs stay NCHW; with ``data_format='NHWC'`` the whole
+    graph runs channels-last internally (cuDNN Tensor Core layout) with a
+    single layout transform at entry and one at exit.
+
+    With ``to_static=True`` the forward is compiled to a static program
+    (dygraph-to-static), replacing per-op eager dispatch with one program
+    on which Paddle's fusion passes (conv + norm + activation, conv +
+    elementwise_add, constant folding) can run, and which can be saved
+    for the inference engine.
+    """
+
+    def __init__(self,
+                 conv_dim=64,
+                 repeat_num=3,
+                 data_format='NCHW',
+                 to_static=False,
+                 fp16_attention=False):
+        super(GeneratorPSGANAttention, self).__init__()
+        self.data_format = data_format
+        self.ma_net = MANet(conv_dim=conv_dim,
+                            repeat_num=repeat_num,
+                            data_format=data_format,
+                            fp16_attention=fp16_attention)
+        self.md_net = MDNet(conv_dim=conv_dim,
+                            repeat_num=repeat_num,
+                            data_format=data_format)
+        self._style_cache = None
+        if to_static:
+            self.forward = fluid.dygraph.declarative(self.forward)
+
+    def forward(self, x, y, x_p, y_p, consistency_mask, mask_x, mask_y):
+        """forward"""
+        # at eval time the reference branch (md_net + style convs) is
+        # recomputed only when the reference tensors change, so transferring
+        # one reference onto many sources or video frames pays for it once;
+        # the cache keeps the reference tensors alive and compares by
+        # identity (id() of a collected tensor can be reused, which would
+        # silently serve a stale style), and as a Python-side effect it is
+        # bypassed while tracing to a static program
+        use_cache = not self.training and fluid.in_dygraph_mode()
+        if self.data_format == 'NHWC':
+            x = fluid.layers.transpose(x, [0, 2, 3, 1])
+        cached = self._style_cache
+        if use_cache and cached is not None and \
+                cached[0] is y and cached[1] is y_p:
+            y_feat, style_cache = cached[2], cached[3]
+        else:
+            if self.data_format == 'NHWC':
+                y_nhwc = fluid.layers.transpose(y, [0, 2, 3, 1])
+                y_feat = self.md_net(y_nhwc)
+            else:
+                y_feat = self.md_net(y)
+            style_cache = self.ma_net.precompute_style(y_feat, y_p)
+            if use_cache:
+                self._style_cache = (y, y_p, y_feat, style_cache)
+        out = self.ma_net(x,
+                          y_feat,
+                          x_p,
+                          y_p,
+                          consistency_mask,
+                          mask_x,
+                          mask_y,
+                          style_cache=style_cache)
+        if self.data_format == 'NHWC':
+            out = fluid.layers.transpose(out, [0, 3, 1, 2])
+        return out